@@ -3,7 +3,16 @@ import matplotlib.pyplot as plt
 import numpy as np
 import random
 import time
+import threading
+import queue
 import networkx as nx
+from numba import njit, prange
+
+# Status codes for the int8 state arrays; also index PALETTE below.
+NEUTRAL = 0
+HIGH_PERFORMER = 1
+ENGAGED = 2
+DISENGAGED = 3
 
 # Initialize simulation parameters
 def get_model_params():
@@ -15,137 +24,222 @@ def get_model_params():
     }
 
 def moving_average(data, window_size=10):
-    if len(data) < window_size:
+    # O(n) cumulative-sum formulation; np.convolve is O(n*window_size)
+    # and allocates the kernel on every call.
+    data = np.asarray(data, dtype=np.float32)
+    if data.size < window_size:
         return data
-    return np.convolve(data, np.ones(window_size)/window_size, mode='valid')
-
-class Employee:
-    def __init__(self, unique_id, status, capacity):
-        self.unique_id = unique_id
-        self.status = status  # "high_performer", "neutral", "engaged", "disengaged"
-        self.capacity = capacity  # Determines influence susceptibility
-        self.influence_timer = 0
-        self.engagement_timer = 0
-
-    def interact(self, colleagues, influence_probability):
-        if self.status == "high_performer":
-            for colleague in colleagues:
-                if colleague.status == "neutral":
-                    susceptibility_factor = 1.0 / colleague.capacity
-                    if random.random() < (influence_probability * susceptibility_factor):
-                        colleague.influence_timer = self.capacity
-
-    def update_status(self):
-        if self.status == "neutral" and self.influence_timer > 0:
-            self.influence_timer -= 1
-            if self.influence_timer == 0:
-                self.status = "high_performer"
-                self.engagement_timer = 3
-        elif self.status == "high_performer" and self.engagement_timer > 0:
-            self.engagement_timer -= 1
-            if self.engagement_timer == 0:
-                self.status = "engaged" if random.random() > 0.5 else "disengaged"
+    cumsum = np.empty(data.size + 1, dtype=np.float32)
+    cumsum[0] = 0
+    np.cumsum(data, out=cumsum[1:])
+    return (cumsum[window_size:] - cumsum[:-window_size]) * (1.0 / window_size)
+
+@st.cache_resource
+def build_graph(N, m=3, seed=0):
+    """Build the BA graph, its CSR arrays and layout once per (N, m, seed).
+
+    Streamlit reruns with unchanged parameters reuse the cached graph;
+    only the per-agent state arrays are reinitialized per run.
+    """
+    G = nx.barabasi_albert_graph(N, m, seed=seed)
+    A = nx.to_scipy_sparse_array(G, format="csr", dtype=np.int32)
+    # The kernel reads u_edges[k] with k walking each CSR row, so the
+    # edge slots must stay grouped and ordered per source row.
+    A.sort_indices()
+    positions = nx.spring_layout(G, seed=seed, iterations=15)
+    return G, A.indptr.astype(np.int32), A.indices.astype(np.int32), positions
+
+@njit(parallel=True, nogil=True, cache=True)
+def _step_kernel(status, capacity, influence_timer, engagement_timer, indptr, indices, promotion_threshold, u_edges, u_nodes):
+    """Run one simulation step over the CSR graph in native code.
+
+    u_edges and u_nodes are uniform draws batched once per step (one per
+    CSR slot and one per node), replacing per-edge RNG calls inside the
+    loop. Both passes parallelize over nodes: the pull-form influence
+    scan writes only node-local state (each row's timer), the update
+    pass touches each node's own state only, and the pre-sliced uniform
+    arrays mean threads never share RNG state. nogil lets the kernel
+    overlap with the render thread.
+    """
+    num_employees = status.shape[0]
+
+    for node in prange(num_employees):
+        if status[node] == NEUTRAL:
+            threshold = promotion_threshold[node]
+            timer = influence_timer[node]
+            # Branchless neighbor scan: fold the status check and the
+            # Bernoulli trial into one mask and select with arithmetic,
+            # so the inner loop carries no data-dependent branches.
+            for k in range(indptr[node], indptr[node + 1]):
+                neighbor = indices[k]
+                hit = np.int8((status[neighbor] == HIGH_PERFORMER) & (u_edges[k] < threshold))
+                timer = hit * capacity[neighbor] + (1 - hit) * timer
+            influence_timer[node] = timer
+
+    for node in prange(num_employees):
+        if status[node] == NEUTRAL and influence_timer[node] > 0:
+            influence_timer[node] -= 1
+            if influence_timer[node] == 0:
+                status[node] = HIGH_PERFORMER
+                engagement_timer[node] = 3
+        elif status[node] == HIGH_PERFORMER and engagement_timer[node] > 0:
+            engagement_timer[node] -= 1
+            if engagement_timer[node] == 0:
+                if u_nodes[node] > 0.5:
+                    status[node] = ENGAGED
+                else:
+                    status[node] = DISENGAGED
 
 class PerformanceInfluenceModel:
     def __init__(self, **params):
         self.num_employees = params["N"]
-        self.influence_probability = params["influence_probability"]
-        self.G = nx.barabasi_albert_graph(self.num_employees, 3)
-        self.employees = {}
+        # Stored as float32 so the kernel's threshold math stays in
+        # float32 against the float32 uniform draws instead of upcasting.
+        self.influence_probability = np.float32(params["influence_probability"])
+        # The CSR arrays let the step loop scan contiguous memory instead
+        # of networkx's dict-of-dicts.
+        self.G, self.indptr, self.indices, self.node_positions = build_graph(self.num_employees)
+
+        # Struct-of-arrays agent state: one contiguous buffer per field
+        # instead of one Python object per employee.
+        self.status = np.zeros(self.num_employees, dtype=np.int8)
+        self.capacity = np.random.choice(np.array([1, 2, 3, 4], dtype=np.int8), self.num_employees)
+        self.influence_timer = np.zeros(self.num_employees, dtype=np.int8)
+        self.engagement_timer = np.zeros(self.num_employees, dtype=np.int8)
 
-        all_nodes = list(self.G.nodes())
-        initial_high_performers = random.sample(all_nodes, params["initial_high_performers"])
+        initial_high_performers = random.sample(list(self.G.nodes()), params["initial_high_performers"])
+        self.status[np.array(initial_high_performers)] = HIGH_PERFORMER
 
-        for node in all_nodes:
-            capacity = random.choice([1, 2, 3, 4])
-            status = "high_performer" if node in initial_high_performers else "neutral"
-            self.employees[node] = Employee(node, status, capacity)
+        # Capacity never changes, so the per-node promotion probability
+        # p / capacity is hoisted out of the kernel's row scans.
+        self.promotion_threshold = (self.influence_probability / self.capacity).astype(np.float32)
+
+        self.rng = np.random.default_rng()
 
-        self.node_positions = nx.spring_layout(self.G)
-        self.history = []
         self.influence_counts = []
         self.engaged_counts = []
         self.disengaged_counts = []
 
     def step(self, step_num):
-        influences = 0
-        newly_engaged = 0
-        newly_disengaged = 0
-
-        for node, employee in self.employees.items():
-            colleagues = [self.employees[n] for n in self.G.neighbors(node)]
-            employee.interact(colleagues, self.influence_probability)
-
-        for employee in self.employees.values():
-            prev_status = employee.status
-            employee.update_status()
-            if prev_status == "neutral" and employee.status == "high_performer":
-                influences += 1
-            elif prev_status == "high_performer" and employee.status == "engaged":
-                newly_engaged += 1
-            elif prev_status == "high_performer" and employee.status == "disengaged":
-                newly_disengaged += 1
-
-        self.influence_counts.append(influences)
-        self.engaged_counts.append(newly_engaged)
-        self.disengaged_counts.append(newly_disengaged)
-        self.history.append({node: employee.status for node, employee in self.employees.items()})
-
-def plot_visuals(G, employees, positions, influences, engaged_counts, disengaged_counts):
-    color_map = {"high_performer": "gold", "neutral": "gray", "engaged": "green", "disengaged": "red"}
-    node_colors = [color_map[employees[node].status] for node in G.nodes()]
-    node_sizes = [employees[node].capacity * 50 for node in G.nodes()]
+        # One vectorized draw per CSR slot and one per node for the whole
+        # step, instead of a scalar RNG call per edge inside the kernel.
+        u_edges = self.rng.random(self.indices.size, dtype=np.float32)
+        u_nodes = self.rng.random(self.num_employees, dtype=np.float32)
+        prev_status = self.status.copy()
+        _step_kernel(
+            self.status, self.capacity, self.influence_timer, self.engagement_timer,
+            self.indptr, self.indices, self.promotion_threshold, u_edges, u_nodes,
+        )
+
+        # Tally the per-step transitions in single vectorized passes.
+        status = self.status
+        self.influence_counts.append(int(np.count_nonzero((prev_status == NEUTRAL) & (status == HIGH_PERFORMER))))
+        self.engaged_counts.append(int(np.count_nonzero((prev_status == HIGH_PERFORMER) & (status == ENGAGED))))
+        self.disengaged_counts.append(int(np.count_nonzero((prev_status == HIGH_PERFORMER) & (status == DISENGAGED))))
+
+# Node colors indexed by status code
+PALETTE = np.array(["gray", "gold", "green", "red"])
 
+def init_visuals(G, status, capacity, positions):
+    """Draw the static parts of the dashboard once.
+
+    The network layout and edges never change during a run, so they are
+    drawn a single time; only the node collection gets recolored per
+    frame. Returns (fig, axes, nodes_pc) for update_visuals.
+    """
     fig, axes = plt.subplots(2, 2, figsize=(12, 10))
 
-    nx.draw(G, pos=positions, ax=axes[0, 0], node_color=node_colors, with_labels=False, node_size=node_sizes, edge_color="gray")
+    node_sizes = capacity.astype(np.int32) * 50
+    nx.draw_networkx_edges(G, pos=positions, ax=axes[0, 0], edge_color="gray")
+    nodes_pc = nx.draw_networkx_nodes(G, pos=positions, ax=axes[0, 0], node_color=PALETTE[status], node_size=node_sizes)
     axes[0, 0].set_title("Employee Influence Network")
+    axes[0, 0].set_axis_off()
+
+    plt.tight_layout()
+    return fig, axes, nodes_pc
+
+def update_visuals(axes, nodes_pc, status, influences, engaged_counts, disengaged_counts):
+    nodes_pc.set_facecolor(PALETTE[status])
 
+    axes[0, 1].cla()
     axes[0, 1].plot(moving_average(influences), color="gold", linewidth=1.5)
     axes[0, 1].set_title("Influence Spread Over Time")
     axes[0, 1].set_xlabel("Time (Days)")
     axes[0, 1].set_ylabel("New Influences per Step")
 
+    axes[1, 0].cla()
     axes[1, 0].plot(moving_average(engaged_counts), color="green", linewidth=1.5)
     axes[1, 0].set_title("New Engaged Per Step")
     axes[1, 0].set_xlabel("Time (Days)")
     axes[1, 0].set_ylabel("Engaged Count Per Step")
 
+    axes[1, 1].cla()
     axes[1, 1].plot(moving_average(disengaged_counts), color="red", linewidth=1.5)
     axes[1, 1].set_title("New Disengaged Per Step")
     axes[1, 1].set_xlabel("Time (Days)")
     axes[1, 1].set_ylabel("Disengaged Count Per Step")
 
-    plt.tight_layout()
-    return fig
-
 st.title("Employee Productivity and Performance Influence Simulation")
 params = get_model_params()
 
 if st.button("Run Simulation"):
     st.markdown("<script>window.scrollTo(0, document.body.scrollHeight);</script>", unsafe_allow_html=True)
     model = PerformanceInfluenceModel(**params)
+    steps = params["steps"]
     progress_bar = st.progress(0)
     visual_plot = st.empty()
+    fig, axes, nodes_pc = init_visuals(model.G, model.status, model.capacity, model.node_positions)
+
+    # The simulation runs in a background thread and publishes status
+    # snapshots into a single-slot queue; the main thread renders the
+    # freshest snapshot as fast as matplotlib allows. Stale frames are
+    # dropped, so the simulation never waits on rendering.
+    snapshots = queue.Queue(maxsize=1)
+
+    def run_simulation():
+        for step_num in range(1, steps + 1):
+            model.step(step_num)
+            snapshot = (step_num, model.status.copy())
+            if step_num == steps:
+                snapshots.put(snapshot)  # the final frame must not be dropped
+            else:
+                try:
+                    snapshots.put_nowait(snapshot)
+                except queue.Full:
+                    try:
+                        snapshots.get_nowait()
+                    except queue.Empty:
+                        pass
+                    try:
+                        snapshots.put_nowait(snapshot)
+                    except queue.Full:
+                        pass
 
-    for step_num in range(1, params["steps"] + 1):
-        model.step(step_num)
-        progress_bar.progress(step_num / params["steps"])
-        fig = plot_visuals(model.G, model.employees, model.node_positions, model.influence_counts, model.engaged_counts, model.disengaged_counts)
+    worker = threading.Thread(target=run_simulation, daemon=True)
+    worker.start()
+
+    while True:
+        step_num, status_snapshot = snapshots.get()
+        progress_bar.progress(step_num / steps)
+        update_visuals(axes, nodes_pc, status_snapshot, model.influence_counts, model.engaged_counts, model.disengaged_counts)
         visual_plot.pyplot(fig)
+        if step_num == steps:
+            break
 
+    worker.join()
+    plt.close(fig)
     st.write("Simulation Complete.")
 
 st.markdown(
     """
     ## Employee Productivity and Performance Influence Simulation
 
-    This simulation models **employee performance influence** within an organization using a **scale-free network**. 
+    This simulation models **employee performance influence** within an organization using a **scale-free network**.
     In this network:
-    
+
     - **Nodes** represent employees.
     - **Edges** represent relationships (mentorship, team collaboration, etc.).
-    
+
     ### How it Works:
     - **High-performing employees (red nodes)** influence their direct connections.
     - **Neutral employees (gray nodes)** can become high performers through peer influence.
@@ -160,7 +254,7 @@ st.markdown(
     - **Disengaged Employees Over Time** (Bottom-Right): Number of employees losing engagement.
 
     ### Purpose:
-    This model helps explore how **influence, engagement and disengagement** spread through an organization, 
+    This model helps explore how **influence, engagement and disengagement** spread through an organization,
     providing insights into how workplace culture and performance may evolve over time.
 
     """